@@ -1,25 +1,21 @@
 from flask import Flask, render_template, request, redirect, url_for, flash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timedelta
+from functools import lru_cache
+import hashlib
 import json
+import math
+import os
 
-from calculos import calcular_intensidade_carbono
-from database import db, init_db, Calculo, User
+from calculos import calcular_intensidade_carbono, comparar_calculos, otimizar_distribuicao, CAMPOS_OTIMIZACAO, MATRIZ_MUT, PERCENTUAL_RESIDUOS
+from database import db, init_db, Calculo, User, compactar_entradas, expandir_entradas
 
 app = Flask(__name__)
 
-@app.template_filter('from_json')
-def from_json(value):
-    """Filtro para converter string JSON em dicionário no template"""
-    if not value:
-        return {}
-    try:
-        return json.loads(value)
-    except Exception as e:
-        return {}
-    
 # --- CONFIGURAÇÕES DO BANCO DE DADOS ---
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///biocalc.db'
+# BIOCALC_DATABASE_URI permite apontar para outro banco (ex.: teste de carga)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('BIOCALC_DATABASE_URI', 'sqlite:///biocalc.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'chave-super-secreta-biocalc'
 
@@ -86,6 +82,9 @@ TIPOS_VEICULOS = [
     {'id': 'ferroviario', 'nome': 'Transporte, ferroviário'}
 ]
 
+# --- LIMITE DE CÁLCULOS POR COMPARAÇÃO ---
+MAX_COMPARACAO = 50
+
 # --- VALORES PADRÃO PARA FORMULÁRIO ---
 VALORES_PADRAO = { 'quantidade_biomassa': 12000, 'aproveitamento_biomassa': 1.2, 'distancia_transporte_biomassa': 100 }
 
@@ -227,8 +226,8 @@ def calcular():
         Template de resultados ou template de erro
     """
     try:
-        # Converte FormData em dicionário Python
-        dados = request.form.to_dict()
+        # Converte FormData em dicionário Python (sem os campos do otimizador)
+        dados = {campo: valor for campo, valor in request.form.items() if campo not in CAMPOS_OTIMIZACAO}
         
         # Executa cálculo ACV (do módulo calculos.py)
         resultado = calcular_intensidade_carbono(dados)
@@ -236,10 +235,13 @@ def calcular():
         # Cria novo registro no banco de dados
         novo_calculo = Calculo(
             user_id=current_user.id,
-            dados_entrada=json.dumps(dados),      
+            dados_entrada=compactar_entradas(dados),
             resultados=json.dumps(resultado),      
             biomassa=dados.get('biomassa', 'Desconhecida'),
-            metodo_acv="RenovaBio"
+            metodo_acv="RenovaBio",
+            intensidade=resultado['intensidade_total_g_co2eq_mj'],
+            cbios=resultado['cbios'],
+            estado_producao=dados.get('estado_producao')
         )
         db.session.add(novo_calculo)
         db.session.commit()
@@ -256,17 +258,99 @@ def calcular():
         # Em caso de erro, exibe página de erro com detalhes
         return render_template('erro.html', erro="Erro no cálculo", detalhe=str(e))
 
+@app.route('/otimizar_transporte', methods=['POST'])
+@login_required
+def otimizar_transporte():
+    """
+    ROTA DE OTIMIZAÇÃO DA DISTRIBUIÇÃO
+
+    Recebe o mesmo formulário da calculadora, com limites de capacidade
+    opcionais por modal, e exibe a divisão modal e o caminhão ótimos.
+    Nada é salvo no histórico.
+    """
+    try:
+        dados = request.form.to_dict()
+        otimizacao = otimizar_distribuicao(dados, dados.get('objetivo_otimizacao') or 'intensidade')
+
+        contexto = {
+            'otimizacao': otimizacao,
+            'veiculos': {veiculo['id']: veiculo['nome'] for veiculo in TIPOS_VEICULOS},
+            'inputs': dados,
+            'user': current_user
+        }
+        return render_template('otimizacao.html', **contexto)
+
+    except Exception as e:
+        return render_template('erro.html', erro="Erro na otimização", detalhe=str(e))
+
 # ROTAS DE HISTÓRICO E VISUALIZAÇÃO
 
+def _filtro_float(nome):
+    """Lê um filtro numérico da query string (None se ausente, inválido ou não finito)"""
+    try:
+        valor = float(request.args.get(nome, ''))
+    except ValueError:
+        return None
+    return valor if math.isfinite(valor) else None
+
+def _filtro_data(nome):
+    """Lê um filtro de data no formato AAAA-MM-DD (None se ausente ou inválido)"""
+    try:
+        return datetime.strptime(request.args.get(nome, ''), '%Y-%m-%d')
+    except ValueError:
+        return None
+
 @app.route('/historico')
 @login_required
 def historico():
+    """
+    ROTA DE HISTÓRICO
+
+    Filtros opcionais (query string), aplicados no SQL:
+        - biomassa, estado
+        - data_inicio, data_fim (AAAA-MM-DD, inclusivos)
+        - intensidade_min, intensidade_max
+        - cbios_min, cbios_max
+    """
+    consulta = Calculo.query.filter_by(user_id=current_user.id)
+
+    biomassa = request.args.get('biomassa')
+    if biomassa:
+        consulta = consulta.filter(Calculo.biomassa == biomassa)
+
+    estado = request.args.get('estado')
+    if estado:
+        consulta = consulta.filter(Calculo.estado_producao == estado)
+
+    data_inicio = _filtro_data('data_inicio')
+    if data_inicio:
+        consulta = consulta.filter(Calculo.data >= data_inicio)
+
+    data_fim = _filtro_data('data_fim')
+    if data_fim:
+        consulta = consulta.filter(Calculo.data < data_fim + timedelta(days=1))
+
+    for coluna, nome in ((Calculo.intensidade, 'intensidade'), (Calculo.cbios, 'cbios')):
+        minimo = _filtro_float(f'{nome}_min')
+        if minimo is not None:
+            consulta = consulta.filter(coluna >= minimo)
+        maximo = _filtro_float(f'{nome}_max')
+        if maximo is not None:
+            consulta = consulta.filter(coluna <= maximo)
+
     # Busca cálculos do usuário ordenados por data decrescente
-    calculos = Calculo.query.filter_by(user_id=current_user.id)\
-                           .order_by(Calculo.data.desc())\
-                           .all()
+    calculos = consulta.order_by(Calculo.data.desc()).all()
+
+    # O formulário envia todos os campos, mesmo vazios
+    filtros_ativos = {nome: valor for nome, valor in request.args.items() if valor}
     
-    return render_template('historico.html', calculos=calculos, user=current_user)
+    return render_template('historico.html',
+                         calculos=calculos,
+                         filtros=request.args,
+                         filtros_ativos=filtros_ativos,
+                         biomassas=BIOMASSAS_DISPONIVEIS,
+                         estados=ESTADOS_BRASIL,
+                         user=current_user)
 
 
 @app.route('/detalhes/<int:id>')
@@ -282,7 +366,7 @@ def detalhes(id):
     
     # Desserializa dados JSON salvos no banco
     try:
-        dados_entrada = json.loads(calculo.dados_entrada)
+        dados_entrada = expandir_entradas(calculo.dados_entrada)
         resultados = json.loads(calculo.resultados)
         
         # Compatibilidade: Garante que fossil_ref exista (cálculos antigos)
@@ -303,6 +387,91 @@ def detalhes(id):
     
     return render_template('resultados.html', **contexto)
 
+@app.route('/comparar')
+@login_required
+def comparar():
+    """
+    ROTA DE COMPARAÇÃO DE CÁLCULOS
+
+    Recebe ?ids=1&ids=2... e busca todos os cálculos em uma única consulta.
+    O mais antigo selecionado é a referência dos deltas por fase.
+    """
+    ids = list(dict.fromkeys(request.args.getlist('ids', type=int)))
+    if len(ids) > MAX_COMPARACAO:
+        flash(f'Foram selecionados {len(ids)} cálculos; apenas os {MAX_COMPARACAO} primeiros são comparados.')
+        ids = ids[:MAX_COMPARACAO]
+    if len(ids) < 2:
+        flash('Selecione pelo menos dois cálculos para comparar.')
+        return redirect(url_for('historico'))
+
+    # Filtra pelo usuário na própria consulta: cálculos de terceiros nunca são carregados
+    calculos = Calculo.query.options(db.undefer(Calculo.dados_entrada), db.undefer(Calculo.resultados))\
+                            .filter(Calculo.user_id == current_user.id, Calculo.id.in_(ids))\
+                            .order_by(Calculo.data.asc())\
+                            .all()
+    if len(calculos) < 2:
+        flash('Selecione pelo menos dois cálculos para comparar.')
+        return redirect(url_for('historico'))
+
+    try:
+        entradas = [expandir_entradas(calculo.dados_entrada) for calculo in calculos]
+        resultados = [json.loads(calculo.resultados) for calculo in calculos]
+    except Exception as e:
+        flash(f'Erro ao ler dados do cálculo: {str(e)}')
+        return redirect(url_for('historico'))
+
+    contexto = {
+        'calculos': calculos,
+        'comparacao': comparar_calculos(entradas, resultados),
+        'user': current_user
+    }
+    return render_template('comparacao.html', **contexto)
+
+# ROTAS DE DADOS DE REFERÊNCIA
+
+@lru_cache(maxsize=1)
+def _matriz_mut_json():
+    """Serializa MATRIZ_MUT uma única vez no formato do mapa de calor (JSON, ETag)"""
+    biomassas = [biomassa['id'] for biomassa in BIOMASSAS_DISPONIVEIS]
+    etapas = list(PERCENTUAL_RESIDUOS)
+
+    # Valores alinhados com a lista de estados: valores[biomassa][etapa][indicador] = [...]
+    valores = {
+        biomassa: {
+            etapa: {
+                indicador: [MATRIZ_MUT[(biomassa, estado, etapa)][indicador] for estado in ESTADOS_BRASIL]
+                for indicador in ('impacto_mut', 'agricola_base')
+            }
+            for etapa in etapas
+        }
+        for biomassa in biomassas
+    }
+
+    corpo = json.dumps({
+        'biomassas': biomassas,
+        'estados': ESTADOS_BRASIL,
+        'etapas': etapas,
+        'valores': valores
+    }, ensure_ascii=False)
+    return corpo, hashlib.sha1(corpo.encode('utf-8')).hexdigest()
+
+@app.route('/api/matriz_mut')
+@login_required
+def matriz_mut():
+    """
+    Matriz biomassa x estado x etapa de Mudança de Uso da Terra e subtotal
+    agrícola base, para o mapa de calor nacional.
+
+    A matriz é calculada na inicialização (calculos.MATRIZ_MUT) e serializada
+    uma vez; o navegador revalida com ETag.
+    """
+    corpo, etag = _matriz_mut_json()
+    resposta = app.response_class(corpo, mimetype='application/json')
+    resposta.set_etag(etag)
+    resposta.cache_control.private = True
+    resposta.cache_control.max_age = 86400
+    return resposta.make_conditional(request)
+
 # INICIALIZAÇÃO DA APLICAÇÃO
 if __name__ == '__main__':
     """
@@ -157,6 +157,18 @@ IMPACTO_TRANSPORTE_BIOMASSA = {
     'padrao': 0.0
 }
 
+# Fase de Distribuição (kgCO2eq / t.km)
+FATOR_DISTRIBUICAO_FERROVIARIO = 0.0334
+FATOR_DISTRIBUICAO_HIDROVIARIO = 0.0350
+FATOR_DISTRIBUICAO_NAVIO = 0.00952
+
+FATOR_DISTRIBUICAO_RODOVIARIO = {
+    'caminhao_7_5_16t': 0.0937,
+    'caminhao_16_32t': 0.0980,
+    'caminhao_maior_32t': 0.0611,
+    'caminhao_60m3': 0.0611
+}
+
 # Fase Industrial
 BIOMASSA_COMBUSTAO = {
     'residuo_pinus': 1.9719578,
@@ -193,12 +205,101 @@ INTENSIDADE_CARBONO_FOSSIL = {
 
 }
 
+# Valores assumidos por calcular_intensidade_carbono quando o campo está ausente
+# (vazio nem sempre equivale: distancia_transporte_biomassa vazia vale 0)
+ENTRADAS_PADRAO = {
+    'biomassa': 'residuo_pinus',
+    'possui_info_consumo': 'Não',
+    'entrada_especifica_biomassa': 1.2,
+    'entrada_amido_milho': 0.0,
+    'estado_producao': 'São Paulo',
+    'etapa_ciclo_vida': 'nao_aplica',
+    'distancia_transporte_biomassa': 100.0,
+    'tipo_veiculo_transporte': 'caminhao_16_32t',
+    'existe_cogeneration': 'Não',
+    'quantidade_biomassa_processada_kg': 0.0,
+    'biomassa_cogeracao_kg': 0.0,
+    'eletricidade_rede_media_kwh': 0.0,
+    'eletricidade_rede_alta_kwh': 0.0,
+    'eletricidade_pch_kwh': 0.0,
+    'eletricidade_biomassa_kwh': 0.0,
+    'eletricidade_eolica_kwh': 0.0,
+    'eletricidade_solar_kwh': 0.0,
+    'diesel_consumo': 0.0,
+    'gas_natural_consumo': 0.0,
+    'glp_consumo': 0.0,
+    'gasolina_a_consumo': 0.0,
+    'etanol_anidro_consumo': 0.0,
+    'etanol_hidratado_consumo': 0.0,
+    'cavaco_madeira_consumo': 0.0,
+    'lenha_consumo': 0.0,
+    'agua_litros': 0.0,
+    'oleo_lubrificante_kg': 0.0,
+    'areia_silica_kg': 0.0,
+    'quantidade_biocombustivel_distribuicao_ton': 1.0,
+    'distancia_mercado_domestico_km': 100.0,
+    'percentual_ferroviario': 0.0,
+    'percentual_hidroviario': 0.0,
+    'tipo_veiculo_rodoviario': 'caminhao_16_32t',
+    'quantidade_exportada_ton': 1.0,
+    'distancia_fabrica_porto_km': 0.0,
+    'distancia_porto_consumidor': 0.0,
+    'percentual_ferroviario_porto': 0.0,
+    'percentual_hidroviario_porto': 0.0,
+    'tipo_veiculo_porto': 'caminhao_16_32t',
+    'volume_producao_ton_cbios': 0.0,
+    'combustivel_fossil_substituto': 'media_ponderada'
+}
+
 
 def get_float(val, default=0.0):
     if not val or val == '': return default
     try: return float(val)
     except: return default
 
+def _calcular_impacto_mut(tipo_bio, estado_producao_biomassa, ciclo_de_vida_residuo):
+    poder_calorifico_biomassa = PODER_CALORIFICO.get(tipo_bio, 0.0)
+
+    cultivo_agricola = CULTIVO_AGRICOLA.get(tipo_bio, 'Pinus')
+
+    fator_impacto_mut = 0.0
+    if cultivo_agricola == 'Pinus':
+        fator_impacto_mut = EMISSAO_PINUS_IMPACTO_MUT.get(estado_producao_biomassa, 'São Paulo')
+    elif cultivo_agricola == 'Eucalipto':
+        fator_impacto_mut = EMISSAO_EUCALIPTOS_IMPACTO_MUT.get(estado_producao_biomassa, 'São Paulo')
+    else:
+        fator_impacto_mut = EMISSAO_AMENDOIM_IMPACTO_MUT.get(estado_producao_biomassa, 'São Paulo')
+
+    percentual_alocacao_biomassa = 0.0
+
+    if tipo_bio in ['residuo_pinus', 'residuo_eucaliptus']:
+        percentual_alocacao_biomassa = PERCENTUAL_RESIDUOS.get(ciclo_de_vida_residuo, 0.232083333)
+    else:
+        percentual_alocacao_biomassa = PERCENTUAL_SIMPLES.get(tipo_bio, 0)
+
+    return poder_calorifico_biomassa * (fator_impacto_mut * percentual_alocacao_biomassa)
+
+def _montar_matriz_mut():
+    """
+    Pré-calcula, para cada biomassa x estado x etapa do ciclo de vida:
+        impacto_mut: parcela de Mudança de Uso da Terra
+        agricola_base: produção da biomassa (rendimento padrão, sem amido) + impacto_mut
+    """
+    matriz = {}
+    for tipo_bio in CULTIVO_AGRICOLA:
+        producao_padrao = PODER_CALORIFICO.get(tipo_bio, 0.0) * FATORES_IMPACTO.get(tipo_bio, 0.0)
+        for estado in EMISSAO_PINUS_IMPACTO_MUT:
+            for etapa in PERCENTUAL_RESIDUOS:
+                impacto_mut = _calcular_impacto_mut(tipo_bio, estado, etapa)
+                matriz[(tipo_bio, estado, etapa)] = {
+                    'impacto_mut': impacto_mut,
+                    'agricola_base': producao_padrao + impacto_mut
+                }
+    return matriz
+
+# Calculada uma única vez, na importação do módulo
+MATRIZ_MUT = _montar_matriz_mut()
+
 def calcular_intensidade_carbono(inputs):
     ## Fase Agrícola
 
@@ -214,36 +315,29 @@ def calcular_intensidade_carbono(inputs):
 
     impacto_consumo_amido_milho = 1.2 * get_float(inputs.get('entrada_amido_milho', '0.0'))
 
-    impacto_producao_biomassa = 0.0
-    if inputs.get('possui_info_consumo') == 'Sim':
-        impacto_producao_biomassa = (entrada_biomassa * poder_calorifico_biomassa * fator_impacto_biomassa) + impacto_consumo_amido_milho
-    else:
-        impacto_producao_biomassa = (poder_calorifico_biomassa * fator_impacto_biomassa) + impacto_consumo_amido_milho
-
     # Mudança de Uso da Terra
     estado_producao_biomassa = inputs.get('estado_producao', 'São Paulo')
 
-    cultivo_agricola = CULTIVO_AGRICOLA.get(tipo_bio, 'Pinus')
-
     ciclo_de_vida_residuo = inputs.get('etapa_ciclo_vida', 'nao_aplica')
 
-    fator_impacto_mut = 0.0
-    if cultivo_agricola == 'Pinus':
-        fator_impacto_mut = EMISSAO_PINUS_IMPACTO_MUT.get(estado_producao_biomassa, 'São Paulo')
-    elif cultivo_agricola == 'Eucalipto':
-        fator_impacto_mut = EMISSAO_EUCALIPTOS_IMPACTO_MUT.get(estado_producao_biomassa, 'São Paulo')
-    else:
-        fator_impacto_mut = EMISSAO_AMENDOIM_IMPACTO_MUT.get(estado_producao_biomassa, 'São Paulo')
-
-    percentual_alocacao_biomassa = 0.0
+    celula_mut = MATRIZ_MUT.get((tipo_bio, estado_producao_biomassa, ciclo_de_vida_residuo))
 
-    if tipo_bio in ['residuo_pinus', 'residuo_eucaliptus']:
-        percentual_alocacao_biomassa = PERCENTUAL_RESIDUOS.get(ciclo_de_vida_residuo, 0.232083333)
+    if celula_mut and inputs.get('possui_info_consumo') != 'Sim' and impacto_consumo_amido_milho == 0:
+        # Rendimento padrão e sem amido: produção + MUT já está pré-calculado na matriz
+        subtotal_producao_mut = celula_mut['agricola_base']
     else:
-        percentual_alocacao_biomassa = PERCENTUAL_SIMPLES.get(tipo_bio, 0)
+        impacto_producao_biomassa = 0.0
+        if inputs.get('possui_info_consumo') == 'Sim':
+            impacto_producao_biomassa = (entrada_biomassa * poder_calorifico_biomassa * fator_impacto_biomassa) + impacto_consumo_amido_milho
+        else:
+            impacto_producao_biomassa = (poder_calorifico_biomassa * fator_impacto_biomassa) + impacto_consumo_amido_milho
 
+        if celula_mut:
+            impacto_mut = celula_mut['impacto_mut']
+        else:
+            impacto_mut = _calcular_impacto_mut(tipo_bio, estado_producao_biomassa, ciclo_de_vida_residuo)
 
-    impacto_mut = poder_calorifico_biomassa * (fator_impacto_mut * percentual_alocacao_biomassa)
+        subtotal_producao_mut = impacto_producao_biomassa + impacto_mut
 
     # Transporte da biomassa até a planta industrial
 
@@ -260,7 +354,7 @@ def calcular_intensidade_carbono(inputs):
     impacto_transporte_biomassa = demanda_transporte * IMPACTO_TRANSPORTE_BIOMASSA.get(tipo_veiculo_transporte, 0.0)
 
 
-    total_agricola = impacto_producao_biomassa + impacto_mut + impacto_transporte_biomassa
+    total_agricola = subtotal_producao_mut + impacto_transporte_biomassa
 
     ## Fase Industrial
 
@@ -345,16 +439,9 @@ def calcular_intensidade_carbono(inputs):
     
     tipo_veiculo_rodoviario = inputs.get('tipo_veiculo_rodoviario', 'caminhao_16_32t')
 
-    if tipo_veiculo_rodoviario == "caminhao_7_5_16t":
-        temp = 0.0937
-    elif tipo_veiculo_rodoviario == "caminhao_16_32t":
-        temp = 0.0980
-    elif tipo_veiculo_rodoviario == "caminhao_maior_32t":
-        temp = 0.0611
-    elif tipo_veiculo_rodoviario == "caminhao_60m3":
-        temp = 0.0611
+    temp = FATOR_DISTRIBUICAO_RODOVIARIO[tipo_veiculo_rodoviario]
     
-    impacto_distribuica_domestico_ano = ((quantidade_biocombustivel_distribuicao_ton * (distancia_mercado_domestico_km * percentual_ferroviario) * 0.0334) + (quantidade_biocombustivel_distribuicao_ton * (distancia_mercado_domestico_km * percentual_hidroviario) * 0.0350) + (quantidade_biocombustivel_distribuicao_ton * (distancia_mercado_domestico_km * percentual_rodoviario) * temp)) 
+    impacto_distribuica_domestico_ano = ((quantidade_biocombustivel_distribuicao_ton * (distancia_mercado_domestico_km * percentual_ferroviario) * FATOR_DISTRIBUICAO_FERROVIARIO) + (quantidade_biocombustivel_distribuicao_ton * (distancia_mercado_domestico_km * percentual_hidroviario) * FATOR_DISTRIBUICAO_HIDROVIARIO) + (quantidade_biocombustivel_distribuicao_ton * (distancia_mercado_domestico_km * percentual_rodoviario) * temp)) 
 
     MJ_transportado_domestico_anualmente = quantidade_biocombustivel_distribuicao_ton * 1000 * (1 / poder_calorifico_biomassa)
 
@@ -363,6 +450,7 @@ def calcular_intensidade_carbono(inputs):
     # Exportação
     quantidade_exportada_ton = get_float(inputs.get('quantidade_exportada_ton'), 1)
     
+    impacto_export_mj = 0.0
     if quantidade_exportada_ton > 0:
         distancia_fabrica_porto_km = get_float(inputs.get('distancia_fabrica_porto_km'), 0)
         distancia_porto_consumidor = get_float(inputs.get('distancia_porto_consumidor'), 0)
@@ -373,20 +461,13 @@ def calcular_intensidade_carbono(inputs):
         
         tipo_veiculo_porto = inputs.get('tipo_veiculo_porto', 'caminhao_16_32t')
 
-        if tipo_veiculo_porto == "caminhao_7_5_16t":
-            temp2 = 0.0937
-        elif tipo_veiculo_porto == "caminhao_16_32t":
-            temp2 = 0.0980
-        elif tipo_veiculo_porto == "caminhao_maior_32t":
-            temp2 = 0.0611
-        elif tipo_veiculo_porto == "caminhao_60m3":
-            temp2 = 0.0611
+        temp2 = FATOR_DISTRIBUICAO_RODOVIARIO[tipo_veiculo_porto]
         
         # Fábrica->Porto
-        impacto_distribuicao_externo_fabricaporto = (quantidade_exportada_ton * (distancia_fabrica_porto_km * percentual_ferroviario_porto) * 0.0334) + (quantidade_exportada_ton * (distancia_fabrica_porto_km * percentual_hidroviario_porto) * 0.0350) + (quantidade_exportada_ton * (distancia_fabrica_porto_km * percentual_rodoviario_porto) * temp2)
+        impacto_distribuicao_externo_fabricaporto = (quantidade_exportada_ton * (distancia_fabrica_porto_km * percentual_ferroviario_porto) * FATOR_DISTRIBUICAO_FERROVIARIO) + (quantidade_exportada_ton * (distancia_fabrica_porto_km * percentual_hidroviario_porto) * FATOR_DISTRIBUICAO_HIDROVIARIO) + (quantidade_exportada_ton * (distancia_fabrica_porto_km * percentual_rodoviario_porto) * temp2)
         
         # Porto->Consumidor
-        impacto_distribuicao_externo_porto_consumidor = quantidade_exportada_ton * distancia_porto_consumidor * 0.00952
+        impacto_distribuicao_externo_porto_consumidor = quantidade_exportada_ton * distancia_porto_consumidor * FATOR_DISTRIBUICAO_NAVIO
         
         # MJ Exportado
         mj_exportado = quantidade_exportada_ton * 1000 * (1 / poder_calorifico_biomassa)
@@ -422,4 +503,137 @@ def calcular_intensidade_carbono(inputs):
             'transporte': total_transporte,
             'uso': total_uso
         }
-    }
\ No newline at end of file
+    }
+
+FASES_CICLO_VIDA = ('agricola', 'industrial', 'transporte', 'uso')
+
+def _normalizar_entrada(valor):
+    # Sem padrões: vazio e ausente nem sempre equivalem para o motor
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return valor
+
+def comparar_calculos(entradas, resultados):
+    """
+    Compara cálculos salvos em uma única passada.
+
+    O primeiro cálculo da lista é a referência dos deltas.
+
+    Returns:
+        campos_diferentes: {campo: [valor em cada cálculo]} apenas para campos que variam
+        fases: {fase: [valor em cada cálculo]}, incluindo 'total'
+        deltas: {fase: [valor - referência]}
+    """
+    campos = sorted(set().union(*entradas))
+    campos_diferentes = {}
+    for campo in campos:
+        valores = [dados.get(campo) for dados in entradas]
+        if len({_normalizar_entrada(valor) for valor in valores}) > 1:
+            campos_diferentes[campo] = valores
+
+    fases = {fase: [] for fase in FASES_CICLO_VIDA + ('total',)}
+    for resultado in resultados:
+        detalhes = resultado.get('detalhes', {})
+        for fase in FASES_CICLO_VIDA:
+            fases[fase].append(detalhes.get(fase, 0.0))
+        fases['total'].append(resultado.get('intensidade_total_g_co2eq_mj', 0.0))
+
+    deltas = {fase: [valor - valores[0] for valor in valores] for fase, valores in fases.items()}
+
+    return {
+        'campos_diferentes': campos_diferentes,
+        'fases': fases,
+        'deltas': deltas
+    }
+
+
+MODAIS_DISTRIBUICAO = ('ferroviario', 'hidroviario', 'rodoviario')
+
+# Campos do formulário lidos só pelo otimizador; não afetam o cálculo
+CAMPOS_OTIMIZACAO = tuple(f'limite_{modal}{sufixo}' for sufixo in ('', '_porto') for modal in MODAIS_DISTRIBUICAO) + ('objetivo_otimizacao',)
+
+def _dividir_modais(fator_rodoviario, limites):
+    """
+    Resolve o PL da divisão modal de um trecho.
+
+    Minimizar a soma de parcela * fator com parcelas que somam 1 e limites
+    por modal tem solução exata: ocupar primeiro o modal de menor fator.
+    """
+    fatores = {
+        'ferroviario': FATOR_DISTRIBUICAO_FERROVIARIO,
+        'hidroviario': FATOR_DISTRIBUICAO_HIDROVIARIO,
+        'rodoviario': fator_rodoviario
+    }
+    divisao = {}
+    restante = 1.0
+    for modal in sorted(MODAIS_DISTRIBUICAO, key=fatores.get):
+        divisao[modal] = min(restante, limites[modal])
+        restante -= divisao[modal]
+
+    if restante > 1e-9:
+        raise ValueError('Os limites de capacidade dos modais não cobrem 100% da carga')
+    return divisao
+
+def _limites_modais(inputs, sufixo=''):
+    """Lê limites de capacidade (%) do formulário; ausente significa sem limite"""
+    return {modal: min(max(get_float(inputs.get(f'limite_{modal}{sufixo}'), 100.0), 0.0), 100.0) / 100.0
+            for modal in MODAIS_DISTRIBUICAO}
+
+def otimizar_distribuicao(inputs, objetivo='intensidade'):
+    """
+    Busca a divisão modal e o caminhão que minimizam a intensidade de carbono
+    (objetivo='intensidade') ou maximizam os CBIOs (objetivo='cbios').
+
+    Enumera todas as classes de caminhão para o mercado doméstico e, se houver
+    exportação, para o trecho fábrica->porto; cada combinação resolve a divisão
+    modal ótima com os limites 'limite_<modal>' e 'limite_<modal>_porto' (%).
+
+    Returns:
+        atual: resultado com as entradas informadas
+        melhor: melhor candidato
+        candidatos: todas as combinações, da melhor para a pior
+    """
+    if objetivo not in ('intensidade', 'cbios'):
+        raise ValueError(f'Objetivo desconhecido: {objetivo}')
+
+    limites = _limites_modais(inputs)
+    limites_porto = _limites_modais(inputs, '_porto')
+
+    veiculos_porto = list(FATOR_DISTRIBUICAO_RODOVIARIO)
+    if get_float(inputs.get('quantidade_exportada_ton'), 1) <= 0:
+        # Sem exportação o trecho até o porto não influencia o resultado
+        veiculos_porto = [inputs.get('tipo_veiculo_porto', 'caminhao_16_32t')]
+
+    divisoes = {veiculo: _dividir_modais(fator, limites) for veiculo, fator in FATOR_DISTRIBUICAO_RODOVIARIO.items()}
+    divisoes_porto = {veiculo: _dividir_modais(FATOR_DISTRIBUICAO_RODOVIARIO.get(veiculo, 0.0), limites_porto) for veiculo in veiculos_porto}
+
+    candidatos = []
+    for veiculo, divisao in divisoes.items():
+        for veiculo_porto, divisao_porto in divisoes_porto.items():
+            cenario = dict(inputs,
+                           tipo_veiculo_rodoviario=veiculo,
+                           percentual_ferroviario=divisao['ferroviario'] * 100,
+                           percentual_hidroviario=divisao['hidroviario'] * 100,
+                           tipo_veiculo_porto=veiculo_porto,
+                           percentual_ferroviario_porto=divisao_porto['ferroviario'] * 100,
+                           percentual_hidroviario_porto=divisao_porto['hidroviario'] * 100)
+            candidatos.append({
+                'tipo_veiculo_rodoviario': veiculo,
+                'divisao': divisao,
+                'tipo_veiculo_porto': veiculo_porto,
+                'divisao_porto': divisao_porto,
+                'resultado': calcular_intensidade_carbono(cenario)
+            })
+
+    if objetivo == 'cbios':
+        candidatos.sort(key=lambda candidato: -candidato['resultado']['cbios'])
+    else:
+        candidatos.sort(key=lambda candidato: candidato['resultado']['intensidade_total_g_co2eq_mj'])
+
+    return {
+        'objetivo': objetivo,
+        'atual': calcular_intensidade_carbono(inputs),
+        'melhor': candidatos[0],
+        'candidatos': candidatos
+    }
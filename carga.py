@@ -0,0 +1,407 @@
+"""
+TESTE DE CARGA LOCAL DO BIOCALC
+
+Sobe o servidor em um processo separado com um banco SQLite temporário,
+cria usuários sintéticos com histórico de cálculos e simula usuários
+concorrentes executando uma mistura de login, registro, /calcular,
+/historico e /detalhes. Ao final de cada nível de concorrência exibe a
+vazão e as latências p50/p95/p99 por rota.
+
+Roda totalmente offline, apenas com a biblioteca padrão e as dependências
+do próprio projeto.
+
+Uso:
+    python carga.py --usuarios 20 --calculos-por-usuario 50 --concorrencia 1,4,16 --duracao 20
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+SENHA_SINTETICA = 'carga123'
+
+# Pesos padrão de cada ação na mistura simulada
+MIX_PADRAO = {
+    'login': 1,
+    'register': 1,
+    'calcular': 3,
+    'historico': 4,
+    'detalhes': 3
+}
+
+# Valores padrão do formulário da calculadora (templates/index.html)
+FORMULARIO_BASE = {
+    'possui_info_consumo': 'Não',
+    'entrada_amido_milho': '0',
+    'etapa_ciclo_vida': 'nao_aplica',
+    'distancia_transporte_biomassa': '100',
+    'tipo_veiculo_transporte': 'caminhao_16_32t',
+    'existe_cogeneration': 'Não',
+    'quantidade_biomassa_processada_kg': '12000000',
+    'biomassa_cogeracao_kg': '0',
+    'eletricidade_biomassa_kwh': '1846801',
+    'diesel_consumo': '24.40',
+    'quantidade_biocombustivel_distribuicao_ton': '12000',
+    'distancia_mercado_domestico_km': '100',
+    'percentual_ferroviario': '0',
+    'percentual_hidroviario': '0',
+    'tipo_veiculo_rodoviario': 'caminhao_16_32t',
+    'quantidade_exportada_ton': '0',
+    'distancia_fabrica_porto_km': '410',
+    'percentual_ferroviario_porto': '0',
+    'percentual_hidroviario_porto': '0',
+    'tipo_veiculo_porto': 'caminhao_16_32t',
+    'distancia_porto_consumidor': '10015.23',
+    'volume_producao_ton_cbios': '12000',
+    'combustivel_fossil_substituto': 'media_ponderada'
+}
+
+# Resposta esperada por rota: (status, destino do redirect, marcador no corpo).
+# Login/registro com falha também redirecionam (de volta ao formulário) e
+# /calcular com erro devolve 200 com erro.html, por isso o status não basta.
+RESPOSTA_ESPERADA = {
+    'POST /login': (302, '/calculadora', None),
+    'POST /register': (302, '/calculadora', None),
+    'POST /calcular': (200, None, '<title>BioCalc - Resultados</title>'),
+    'GET /historico': (200, None, '<title>Histórico - BioCalc</title>'),
+    'GET /detalhes': (200, None, '<title>BioCalc - Resultados</title>')
+}
+
+VEICULOS_RODOVIARIOS = ['caminhao_7_5_16t', 'caminhao_16_32t', 'caminhao_maior_32t', 'caminhao_60m3']
+
+
+def formulario_aleatorio(rng, biomassas, estados):
+    """Gera um formulário da calculadora com variações plausíveis"""
+    dados = dict(FORMULARIO_BASE)
+    dados.update({
+        'biomassa': rng.choice(biomassas),
+        'estado_producao': rng.choice(estados),
+        'distancia_transporte_biomassa': str(rng.randint(10, 500)),
+        'distancia_mercado_domestico_km': str(rng.randint(20, 1500)),
+        'percentual_ferroviario': str(rng.choice([0, 0, 10, 30, 50])),
+        'tipo_veiculo_rodoviario': rng.choice(VEICULOS_RODOVIARIOS),
+        'volume_producao_ton_cbios': str(rng.randint(1000, 50000))
+    })
+    return dados
+
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método do posto mais próximo"""
+    if not valores_ordenados:
+        return 0.0
+    posicao = max(0, min(len(valores_ordenados) - 1, math.ceil(p * len(valores_ordenados) / 100) - 1))
+    return valores_ordenados[posicao]
+
+
+# --- PREPARAÇÃO DO BANCO ---
+
+def popular_banco(num_usuarios, calculos_por_usuario, semente):
+    """
+    Cria usuários sintéticos e seus históricos diretamente no banco.
+
+    Deve ser chamado com BIOCALC_DATABASE_URI já apontando para o banco temporário.
+
+    Returns:
+        ({username: [ids dos cálculos]}, ids das biomassas, estados)
+    """
+    from werkzeug.security import generate_password_hash
+
+    from app import app, BIOMASSAS_DISPONIVEIS, ESTADOS_BRASIL
+    from calculos import calcular_intensidade_carbono
+    from database import db, Calculo, User, compactar_entradas
+
+    rng = random.Random(semente)
+    biomassas = [biomassa['id'] for biomassa in BIOMASSAS_DISPONIVEIS]
+    agora = datetime.utcnow()
+    # O hash é o mesmo para todos: evita pagar o scrypt uma vez por usuário
+    senha_hash = generate_password_hash(SENHA_SINTETICA, method='scrypt')
+
+    historicos = {}
+    with app.app_context():
+        for indice in range(num_usuarios):
+            usuario = User(username=f'carga_{indice}', nome=f'Usuário Carga {indice}', password_hash=senha_hash)
+            db.session.add(usuario)
+            db.session.flush()
+
+            calculos = []
+            for _ in range(calculos_por_usuario):
+                dados = formulario_aleatorio(rng, biomassas, ESTADOS_BRASIL)
+                resultado = calcular_intensidade_carbono(dados)
+                calculos.append(Calculo(
+                    user_id=usuario.id,
+                    data=agora - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+                    dados_entrada=compactar_entradas(dados),
+                    resultados=json.dumps(resultado),
+                    biomassa=dados['biomassa'],
+                    metodo_acv="RenovaBio",
+                    intensidade=resultado['intensidade_total_g_co2eq_mj'],
+                    cbios=resultado['cbios'],
+                    estado_producao=dados['estado_producao']
+                ))
+            db.session.add_all(calculos)
+            db.session.flush()
+            historicos[usuario.username] = [calculo.id for calculo in calculos]
+
+        db.session.commit()
+
+    return historicos, biomassas, ESTADOS_BRASIL
+
+
+# --- SERVIDOR ---
+
+def porta_livre():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def servir(porta):
+    """Executa o app em um servidor WSGI com threads, sem log por requisição"""
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    make_server('127.0.0.1', porta, app, threaded=True).serve_forever()
+
+
+def iniciar_servidor(porta, ambiente, timeout=30):
+    processo = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--servir', str(porta)], env=ambiente)
+
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError('O servidor encerrou durante a inicialização')
+        try:
+            with socket.create_connection(('127.0.0.1', porta), timeout=0.5):
+                return processo
+        except OSError:
+            time.sleep(0.1)
+
+    processo.terminate()
+    raise RuntimeError('O servidor não respondeu a tempo')
+
+
+# --- USUÁRIOS SIMULADOS ---
+
+class _SemRedirecionamento(urllib.request.HTTPRedirectHandler):
+    """Mede cada rota isoladamente: o redirect é devolvido como resposta"""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _novo_cliente():
+    return urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+        _SemRedirecionamento()
+    )
+
+
+class UsuarioSimulado:
+    def __init__(self, base_url, username, ids_calculos, biomassas, estados, rng, registrar):
+        self.base_url = base_url
+        self.username = username
+        self.ids_calculos = ids_calculos
+        self.biomassas = biomassas
+        self.estados = estados
+        self.rng = rng
+        self.registrar = registrar
+        self.cliente = _novo_cliente()
+
+    def _requisitar(self, cliente, rota, caminho, dados=None):
+        """
+        Executa a requisição e confere a resposta contra RESPOSTA_ESPERADA[rota].
+
+        Returns: (rota, sucesso, latência em segundos)
+        """
+        metodo = rota.split()[0]
+        corpo = urllib.parse.urlencode(dados).encode('utf-8') if dados is not None else None
+        requisicao = urllib.request.Request(self.base_url + caminho, data=corpo, method=metodo)
+        inicio = time.perf_counter()
+        try:
+            with cliente.open(requisicao, timeout=60) as resposta:
+                conteudo = resposta.read()
+                status, destino = resposta.status, None
+        except urllib.error.HTTPError as e:
+            conteudo = e.read()
+            status, destino = e.code, e.headers.get('Location')
+        except OSError:
+            return rota, False, time.perf_counter() - inicio
+        latencia = time.perf_counter() - inicio
+
+        status_esperado, destino_esperado, marcador = RESPOSTA_ESPERADA[rota]
+        sucesso = status == status_esperado
+        if destino_esperado is not None:
+            sucesso = sucesso and urllib.parse.urlsplit(destino or '').path == destino_esperado
+        if marcador is not None:
+            sucesso = sucesso and marcador.encode('utf-8') in conteudo
+        return rota, sucesso, latencia
+
+    def login(self):
+        return self._requisitar(self.cliente, 'POST /login', '/login',
+                                {'username': self.username, 'password': SENHA_SINTETICA})
+
+    def executar(self, acao):
+        """Executa uma ação da mistura. Returns: (rota, sucesso, latência)"""
+        if acao == 'login':
+            # Sessão nova para que o login não seja curto-circuitado pelo redirect de usuário logado
+            self.cliente = _novo_cliente()
+            return self.login()
+
+        if acao == 'register':
+            username = self.registrar()
+            return self._requisitar(_novo_cliente(), 'POST /register', '/register',
+                                    {'username': username, 'password': SENHA_SINTETICA, 'nome': username})
+
+        if acao == 'calcular':
+            dados = formulario_aleatorio(self.rng, self.biomassas, self.estados)
+            return self._requisitar(self.cliente, 'POST /calcular', '/calcular', dados)
+
+        if acao == 'historico':
+            return self._requisitar(self.cliente, 'GET /historico', '/historico')
+
+        if acao == 'detalhes':
+            id_calculo = self.rng.choice(self.ids_calculos)
+            return self._requisitar(self.cliente, 'GET /detalhes', f'/detalhes/{id_calculo}')
+
+        raise ValueError(f'Ação desconhecida: {acao}')
+
+
+def executar_nivel(base_url, historicos, biomassas, estados, concorrencia, duracao, mix, semente):
+    """
+    Roda `concorrencia` usuários simultâneos durante `duracao` segundos.
+
+    Returns:
+        ({rota: [(sucesso, latência), ...]}, tempo decorrido)
+    """
+    acoes = list(mix)
+    pesos = [mix[acao] for acao in acoes]
+    usernames = list(historicos)
+    medicoes = {}
+    trava = threading.Lock()
+    contador_registros = [0]
+
+    def registrar():
+        with trava:
+            contador_registros[0] += 1
+            return f'novo_{semente}_{contador_registros[0]}'
+
+    def trabalhador(indice, fim):
+        rng = random.Random(semente * 100003 + indice)
+        username = usernames[indice % len(usernames)]
+        usuario = UsuarioSimulado(base_url, username, historicos[username], biomassas, estados, rng, registrar)
+        usuario.login()
+
+        locais = []
+        while time.monotonic() < fim:
+            locais.append(usuario.executar(rng.choices(acoes, weights=pesos)[0]))
+
+        with trava:
+            for rota, sucesso, latencia in locais:
+                medicoes.setdefault(rota, []).append((sucesso, latencia))
+
+    inicio = time.monotonic()
+    fim = inicio + duracao
+    threads = [threading.Thread(target=trabalhador, args=(indice, fim)) for indice in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return medicoes, time.monotonic() - inicio
+
+
+def imprimir_relatorio(concorrencia, medicoes, decorrido):
+    """Vazão e percentis consideram só respostas corretas; falhas aparecem em Erros"""
+    print(f'\n=== Concorrência: {concorrencia} usuários | {decorrido:.1f} s ===')
+    print(f'{"Rota":<16}{"Req":>8}{"Erros":>8}{"OK/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+    todas = []
+    for rota in sorted(medicoes):
+        todas.extend(medicoes[rota])
+        _imprimir_linha(rota, medicoes[rota], decorrido)
+    _imprimir_linha('TOTAL', todas, decorrido)
+
+
+def _imprimir_linha(rota, amostras, decorrido):
+    latencias = sorted(latencia * 1000 for sucesso, latencia in amostras if sucesso)
+    erros = len(amostras) - len(latencias)
+    print(f'{rota:<16}{len(amostras):>8}{erros:>8}{len(latencias) / decorrido:>10.1f}'
+          f'{percentil(latencias, 50):>10.1f}{percentil(latencias, 95):>10.1f}{percentil(latencias, 99):>10.1f}')
+
+
+def _ler_mix(texto):
+    """Converte 'calcular=3,historico=4' em pesos, partindo do MIX_PADRAO"""
+    mix = dict(MIX_PADRAO)
+    for item in filter(None, texto.split(',')):
+        acao, _, peso = item.partition('=')
+        if acao not in MIX_PADRAO:
+            raise argparse.ArgumentTypeError(f'Ação desconhecida no mix: {acao}')
+        mix[acao] = float(peso)
+    return {acao: peso for acao, peso in mix.items() if peso > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga local do BioCalc')
+    parser.add_argument('--usuarios', type=int, default=20, help='usuários sintéticos pré-cadastrados')
+    parser.add_argument('--calculos-por-usuario', type=int, default=50, help='cálculos no histórico de cada usuário')
+    parser.add_argument('--concorrencia', default='1,4,16',
+                        help='níveis de usuários simultâneos, separados por vírgula')
+    parser.add_argument('--duracao', type=float, default=20, help='segundos de carga em cada nível')
+    parser.add_argument('--mix', type=_ler_mix, default=dict(MIX_PADRAO),
+                        help='pesos das ações, ex.: calcular=3,historico=4,detalhes=3,login=1,register=1')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--servir', type=int, metavar='PORTA', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servir:
+        servir(args.servir)
+        return
+
+    niveis = [int(nivel) for nivel in args.concorrencia.split(',') if nivel.strip()]
+    if args.usuarios < 1 or args.calculos_por_usuario < 1 or not niveis:
+        parser.error('são necessários ao menos um usuário, um cálculo por usuário e um nível de concorrência')
+
+    diretorio = tempfile.mkdtemp(prefix='biocalc-carga-')
+    ambiente = dict(os.environ, BIOCALC_DATABASE_URI='sqlite:///' + os.path.join(diretorio, 'carga.db'))
+    os.environ.update(ambiente)
+
+    servidor = None
+    try:
+        inicio = time.monotonic()
+        historicos, biomassas, estados = popular_banco(args.usuarios, args.calculos_por_usuario, args.semente)
+        print(f'Banco populado: {args.usuarios} usuários x {args.calculos_por_usuario} cálculos '
+              f'em {time.monotonic() - inicio:.1f} s ({diretorio})')
+
+        porta = porta_livre()
+        servidor = iniciar_servidor(porta, ambiente)
+        base_url = f'http://127.0.0.1:{porta}'
+        print(f'Servidor em {base_url} | mix: {args.mix}')
+
+        for concorrencia in niveis:
+            medicoes, decorrido = executar_nivel(base_url, historicos, biomassas, estados,
+                                                 concorrencia, args.duracao, args.mix, args.semente + concorrencia)
+            imprimir_relatorio(concorrencia, medicoes, decorrido)
+    finally:
+        if servidor:
+            servidor.terminate()
+            servidor.wait()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
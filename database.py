@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+import base64
 import json
+import zlib
 
 db = SQLAlchemy()
 
@@ -17,13 +19,28 @@ class User(UserMixin, db.Model):
 class Calculo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     data = db.Column(db.DateTime, default=datetime.utcnow)
-    dados_entrada = db.Column(db.Text)
-    resultados = db.Column(db.Text)
+    # Carregados sob demanda: o histórico usa apenas as colunas de resumo abaixo
+    dados_entrada = db.deferred(db.Column(db.Text))
+    resultados = db.deferred(db.Column(db.Text))
     metodo_acv = db.Column(db.String(50))
     biomassa = db.Column(db.String(100))
+
+    # Resumo dos resultados, para filtrar o histórico direto no SQL
+    intensidade = db.Column(db.Float)
+    cbios = db.Column(db.Float)
+    estado_producao = db.Column(db.String(50))
     
     # Chave estrangeira ligando ao usuário (pode ser nulo se for visitante)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+    # Toda busca do histórico é restrita ao usuário, por isso user_id lidera os índices
+    __table_args__ = (
+        db.Index('ix_calculo_user_data', 'user_id', 'data'),
+        db.Index('ix_calculo_user_biomassa', 'user_id', 'biomassa', 'data'),
+        db.Index('ix_calculo_user_estado', 'user_id', 'estado_producao', 'data'),
+        db.Index('ix_calculo_user_intensidade', 'user_id', 'intensidade'),
+        db.Index('ix_calculo_user_cbios', 'user_id', 'cbios'),
+    )
     
     def to_dict(self):
         return {
@@ -34,8 +51,152 @@ class Calculo(db.Model):
             'resultados': json.loads(self.resultados) if self.resultados else {}
         }
 
+# --- ARMAZENAMENTO COMPACTO DAS ENTRADAS ---
+# Formato: "<versão>:<json>" ou "<versão>z:<json comprimido em zlib/base64>".
+# Registros antigos (JSON puro, sem prefixo) continuam legíveis.
+VERSAO_ENTRADAS = 1
+LIMIAR_COMPRESSAO = 256
+
+# Padrões omitidos na gravação, congelados por versão do formato. Incluir um
+# campo ou mudar um valor exige uma nova versão, senão registros antigos seriam
+# reconstruídos com valores que nunca foram digitados.
+PADROES_POR_VERSAO = {
+    1: {
+        'biomassa': 'residuo_pinus',
+        'possui_info_consumo': 'Não',
+        'entrada_especifica_biomassa': 1.2,
+        'entrada_amido_milho': 0.0,
+        'estado_producao': 'São Paulo',
+        'etapa_ciclo_vida': 'nao_aplica',
+        'distancia_transporte_biomassa': 100.0,
+        'tipo_veiculo_transporte': 'caminhao_16_32t',
+        'existe_cogeneration': 'Não',
+        'quantidade_biomassa_processada_kg': 0.0,
+        'biomassa_cogeracao_kg': 0.0,
+        'eletricidade_rede_media_kwh': 0.0,
+        'eletricidade_rede_alta_kwh': 0.0,
+        'eletricidade_pch_kwh': 0.0,
+        'eletricidade_biomassa_kwh': 0.0,
+        'eletricidade_eolica_kwh': 0.0,
+        'eletricidade_solar_kwh': 0.0,
+        'diesel_consumo': 0.0,
+        'gas_natural_consumo': 0.0,
+        'glp_consumo': 0.0,
+        'gasolina_a_consumo': 0.0,
+        'etanol_anidro_consumo': 0.0,
+        'etanol_hidratado_consumo': 0.0,
+        'cavaco_madeira_consumo': 0.0,
+        'lenha_consumo': 0.0,
+        'agua_litros': 0.0,
+        'oleo_lubrificante_kg': 0.0,
+        'areia_silica_kg': 0.0,
+        'quantidade_biocombustivel_distribuicao_ton': 1.0,
+        'distancia_mercado_domestico_km': 100.0,
+        'percentual_ferroviario': 0.0,
+        'percentual_hidroviario': 0.0,
+        'tipo_veiculo_rodoviario': 'caminhao_16_32t',
+        'quantidade_exportada_ton': 1.0,
+        'distancia_fabrica_porto_km': 0.0,
+        'distancia_porto_consumidor': 0.0,
+        'percentual_ferroviario_porto': 0.0,
+        'percentual_hidroviario_porto': 0.0,
+        'tipo_veiculo_porto': 'caminhao_16_32t',
+        'volume_producao_ton_cbios': 0.0,
+        'combustivel_fossil_substituto': 'media_ponderada'
+    }
+}
+
+def _igual_ao_padrao(padroes, campo, valor):
+    # Campos vazios ou inválidos são mantidos: o motor nem sempre os trata como
+    # ausentes (ex.: distancia_transporte_biomassa vazia vale 0, ausente vale 100)
+    padrao = padroes.get(campo)
+    if padrao is None:
+        return False
+    if isinstance(padrao, float):
+        try:
+            return float(valor) == padrao
+        except (TypeError, ValueError):
+            return False
+    return valor == padrao
+
+def _completar_com_padroes(dados, versao):
+    completos = {campo: format(padrao, 'g') if isinstance(padrao, float) else padrao
+                 for campo, padrao in PADROES_POR_VERSAO[versao].items()}
+    completos.update(dados)
+    return completos
+
+def compactar_entradas(dados):
+    """Serializa apenas os campos que diferem dos padrões da versão atual"""
+    padroes = PADROES_POR_VERSAO[VERSAO_ENTRADAS]
+    diferentes = {campo: valor for campo, valor in dados.items() if not _igual_ao_padrao(padroes, campo, valor)}
+    texto = json.dumps(diferentes, ensure_ascii=False, separators=(',', ':'))
+
+    if len(texto) >= LIMIAR_COMPRESSAO:
+        comprimido = base64.b64encode(zlib.compress(texto.encode('utf-8'), 9)).decode('ascii')
+        if len(comprimido) < len(texto):
+            return f'{VERSAO_ENTRADAS}z:{comprimido}'
+
+    return f'{VERSAO_ENTRADAS}:{texto}'
+
+def expandir_entradas(valor):
+    """Reconstrói o dicionário completo de entradas a partir do valor salvo"""
+    if not valor:
+        return {}
+
+    # Compatibilidade: cálculos antigos guardavam o formulário em JSON puro,
+    # anterior ao versionamento; completa-se com os padrões da versão 1
+    if valor.startswith('{'):
+        return _completar_com_padroes(json.loads(valor), 1)
+
+    cabecalho, _, corpo = valor.partition(':')
+    comprimido = cabecalho.endswith('z')
+    versao = int(cabecalho.rstrip('z'))
+    if versao not in PADROES_POR_VERSAO:
+        raise ValueError(f'Versão de entradas desconhecida: {versao}')
+
+    if comprimido:
+        corpo = zlib.decompress(base64.b64decode(corpo)).decode('utf-8')
+
+    return _completar_com_padroes(json.loads(corpo), versao)
+
+# Colunas adicionadas depois da criação original da tabela calculo
+COLUNAS_RESUMO = {
+    'intensidade': 'FLOAT',
+    'cbios': 'FLOAT',
+    'estado_producao': 'VARCHAR(50)'
+}
+
+def _migrar_calculo():
+    """Adiciona colunas de resumo e índices em bancos criados antes deles"""
+    existentes = {coluna['name'] for coluna in db.inspect(db.engine).get_columns('calculo')}
+    faltantes = [nome for nome in COLUNAS_RESUMO if nome not in existentes]
+    if not faltantes:
+        return
+
+    with db.engine.begin() as conn:
+        for nome in faltantes:
+            conn.execute(db.text(f'ALTER TABLE calculo ADD COLUMN {nome} {COLUNAS_RESUMO[nome]}'))
+        for indice in Calculo.__table__.indexes:
+            indice.create(conn, checkfirst=True)
+
+    # Preenche o resumo dos cálculos já salvos
+    pendentes = Calculo.query.options(db.undefer(Calculo.resultados), db.undefer(Calculo.dados_entrada))\
+                             .filter(Calculo.intensidade.is_(None))\
+                             .all()
+    for calculo in pendentes:
+        try:
+            resultados = json.loads(calculo.resultados) if calculo.resultados else {}
+            entradas = expandir_entradas(calculo.dados_entrada)
+        except Exception:
+            continue
+        calculo.intensidade = resultados.get('intensidade_total_g_co2eq_mj')
+        calculo.cbios = resultados.get('cbios')
+        calculo.estado_producao = entradas.get('estado_producao')
+    db.session.commit()
+
 def init_db(app):
     db.init_app(app)
     with app.app_context():
         db.create_all()
+        _migrar_calculo()
     return db
\ No newline at end of file
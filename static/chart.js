@@ -249,6 +249,76 @@ function criarGraficoHistorico(canvasElement, historico) {
     });
 }
 
+/**
+ * Cria gráfico de barras empilhadas comparando cálculos fase a fase
+ * @param {HTMLElement} canvasElement - Elemento canvas
+ * @param {Object} comparacao - Objeto com rótulos e valores por fase
+ */
+function criarGraficoComparacao(canvasElement, comparacao) {
+    const ctx = canvasElement.getContext('2d');
+    
+    const fases = [
+        { chave: 'agricola', label: 'Agrícola', cor: CORES_BIO.primaria },
+        { chave: 'industrial', label: 'Industrial', cor: CORES_BIO.secundaria },
+        { chave: 'transporte', label: 'Transporte', cor: CORES_BIO.acento },
+        { chave: 'uso', label: 'Uso Final', cor: CORES_BIO.alerta }
+    ];
+    
+    return new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: comparacao.rotulos,
+            datasets: fases.map(fase => ({
+                label: fase.label,
+                data: comparacao.fases[fase.chave] || [],
+                backgroundColor: fase.cor,
+                borderWidth: 1
+            }))
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'top'
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return `${context.dataset.label}: ${context.parsed.y.toFixed(4)} gCO₂eq/MJ`;
+                        }
+                    }
+                },
+                title: {
+                    display: true,
+                    text: 'Emissões por Fase',
+                    font: {
+                        size: 16
+                    }
+                }
+            },
+            scales: {
+                x: {
+                    stacked: true,
+                    grid: {
+                        display: false
+                    }
+                },
+                y: {
+                    stacked: true,
+                    title: {
+                        display: true,
+                        text: 'gCO₂eq/MJ'
+                    },
+                    grid: {
+                        color: 'rgba(0,0,0,0.1)'
+                    }
+                }
+            }
+        }
+    });
+}
+
 
 /**
  * Exporta gráfico como imagem PNG
@@ -310,4 +380,13 @@ document.addEventListener('DOMContentLoaded', function() {
             console.warn('Dados históricos inválidos:', e);
         }
     });
+    
+    document.querySelectorAll('[data-grafico="comparacao"]').forEach(canvas => {
+        try {
+            const comparacao = JSON.parse(canvas.dataset.comparacao);
+            criarGraficoComparacao(canvas, comparacao);
+        } catch (e) {
+            console.warn('Dados de comparação inválidos:', e);
+        }
+    });
 });
\ No newline at end of file
@@ -0,0 +1,18 @@
+from carga import percentil
+
+
+def test_percentil_posto_mais_proximo():
+    valores = list(range(1, 101))
+    assert percentil(valores, 50) == 50
+    assert percentil(valores, 95) == 95
+    assert percentil(valores, 99) == 99
+    assert percentil(valores, 100) == 100
+
+
+def test_percentil_amostra_pequena():
+    valores = list(range(1, 21))
+    assert percentil(valores, 50) == 10
+    assert percentil(valores, 95) == 19
+    assert percentil(valores, 99) == 20
+    assert percentil([7.0], 99) == 7.0
+    assert percentil([], 95) == 0.0
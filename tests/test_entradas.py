@@ -0,0 +1,107 @@
+import json
+
+from calculos import ENTRADAS_PADRAO, calcular_intensidade_carbono, comparar_calculos
+from database import PADROES_POR_VERSAO, VERSAO_ENTRADAS, compactar_entradas, expandir_entradas
+
+# Valores padrão do formulário da calculadora (templates/index.html)
+FORMULARIO = {
+    'biomassa': 'residuo_eucaliptus',
+    'possui_info_consumo': 'Não',
+    'entrada_especifica_biomassa': '',
+    'entrada_amido_milho': '0',
+    'estado_producao': 'Paraná',
+    'etapa_ciclo_vida': 'nao_aplica',
+    'distancia_transporte_biomassa': '100',
+    'tipo_veiculo_transporte': 'caminhao_16_32t',
+    'existe_cogeneration': 'Não',
+    'quantidade_biomassa_processada_kg': '12000000',
+    'biomassa_cogeracao_kg': '0',
+    'eletricidade_biomassa_kwh': '1846801',
+    'diesel_consumo': '24.40',
+    'quantidade_biocombustivel_distribuicao_ton': '12000',
+    'distancia_mercado_domestico_km': '100',
+    'percentual_ferroviario': '0',
+    'percentual_hidroviario': '0',
+    'tipo_veiculo_rodoviario': 'caminhao_16_32t',
+    'quantidade_exportada_ton': '10',
+    'distancia_fabrica_porto_km': '410',
+    'percentual_ferroviario_porto': '0',
+    'percentual_hidroviario_porto': '0',
+    'tipo_veiculo_porto': 'caminhao_16_32t',
+    'distancia_porto_consumidor': '10015.23',
+    'volume_producao_ton_cbios': '12000',
+    'combustivel_fossil_substituto': 'media_ponderada'
+}
+
+# Campos que não podem ficar vazios sem que o próprio cálculo falhe
+OBRIGATORIOS = {'biomassa', 'estado_producao', 'quantidade_biomassa_processada_kg', 'tipo_veiculo_rodoviario', 'tipo_veiculo_porto'}
+
+
+def _ida_e_volta(dados):
+    return expandir_entradas(compactar_entradas(dados))
+
+
+def test_formulario_padrao_preserva_resultado():
+    assert calcular_intensidade_carbono(_ida_e_volta(FORMULARIO)) == calcular_intensidade_carbono(FORMULARIO)
+
+
+def test_campos_vazios_preservam_resultado():
+    for campo in ENTRADAS_PADRAO:
+        if campo in OBRIGATORIOS:
+            continue
+        dados = dict(FORMULARIO, **{campo: ''})
+        assert calcular_intensidade_carbono(_ida_e_volta(dados)) == calcular_intensidade_carbono(dados), campo
+
+
+def test_campos_ausentes_preservam_resultado():
+    for campo in ENTRADAS_PADRAO:
+        if campo in OBRIGATORIOS:
+            continue
+        dados = {chave: valor for chave, valor in FORMULARIO.items() if chave != campo}
+        assert calcular_intensidade_carbono(_ida_e_volta(dados)) == calcular_intensidade_carbono(dados), campo
+
+
+def test_distancia_vazia_nao_vira_padrao():
+    dados = dict(FORMULARIO, distancia_transporte_biomassa='')
+    assert _ida_e_volta(dados)['distancia_transporte_biomassa'] == ''
+
+
+def test_valores_equivalentes_ao_padrao_sao_omitidos():
+    compactado = compactar_entradas({'distancia_mercado_domestico_km': '100.0', 'percentual_ferroviario': '0'})
+    assert compactado == '1:{}'
+
+
+def test_registro_antigo_em_json_puro():
+    assert expandir_entradas(json.dumps(FORMULARIO)) == _ida_e_volta(FORMULARIO)
+
+
+def test_registro_antigo_sem_campo_recebe_padrao():
+    dados = {chave: valor for chave, valor in FORMULARIO.items() if chave != 'distancia_transporte_biomassa'}
+    assert expandir_entradas(json.dumps(dados))['distancia_transporte_biomassa'] == '100'
+
+
+def test_padroes_da_versao_atual_acompanham_o_motor():
+    # Mudou ENTRADAS_PADRAO? Crie uma nova versão em PADROES_POR_VERSAO
+    assert PADROES_POR_VERSAO[VERSAO_ENTRADAS] == ENTRADAS_PADRAO
+
+
+def test_entrada_grande_e_comprimida():
+    dados = dict(FORMULARIO, **{f'campo_{indice}': 'x' * 20 for indice in range(30)})
+    compactado = compactar_entradas(dados)
+    assert compactado.startswith('1z:')
+    assert _ida_e_volta(dados)['campo_7'] == 'x' * 20
+
+
+def test_comparacao_distingue_distancia_vazia_do_padrao():
+    formularios = [dict(FORMULARIO, distancia_transporte_biomassa=''), dict(FORMULARIO, distancia_transporte_biomassa='100')]
+    entradas = [_ida_e_volta(dados) for dados in formularios]
+    resultados = [calcular_intensidade_carbono(dados) for dados in entradas]
+    comparacao = comparar_calculos(entradas, resultados)
+    assert comparacao['deltas']['total'][1] != 0
+    assert comparacao['campos_diferentes'] == {'distancia_transporte_biomassa': ['', '100']}
+
+
+def test_comparacao_ignora_grafias_equivalentes():
+    entradas = [_ida_e_volta(FORMULARIO), expandir_entradas(json.dumps(dict(FORMULARIO, distancia_mercado_domestico_km='100.0')))]
+    resultados = [calcular_intensidade_carbono(dados) for dados in entradas]
+    assert comparar_calculos(entradas, resultados)['campos_diferentes'] == {}